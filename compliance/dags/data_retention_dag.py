@@ -3,16 +3,24 @@ Data Retention and Lifecycle Management DAG
 Implements automated data retention policies and compliance workflows
 """
 
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timedelta
+from typing import Optional
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 from airflow.operators.bash import BashOperator
-from airflow.providers.postgres.operators.postgres import PostgresOperator
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.providers.http.operators.http import SimpleHttpOperator
 from airflow.models import Variable
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import json
+import csv
+import io
+import hashlib
+import time
 
 # Default arguments
 default_args = {
@@ -34,179 +42,641 @@ dag = DAG(
     schedule_interval='@daily',
     catchup=False,
     max_active_runs=1,
+    max_active_tasks=4,
     tags=['compliance', 'gdpr', 'data-retention']
 )
 
+# Retention policies (days)
+RETENTION_POLICIES = {
+    'user_activity_logs': 90,      # 90 days
+    'session_data': 30,            # 30 days
+    'audit_logs': 2555,            # 7 years
+    'user_profiles': 1095,         # 3 years after account deletion
+    'transaction_logs': 2555,      # 7 years
+    'marketing_data': 365,         # 1 year
+    'support_tickets': 1095,       # 3 years
+    'backup_data': 365,            # 1 year
+    'temp_files': 7,               # 7 days
+    'cache_data': 1                # 1 day
+}
+
+# Identify probes are split into one UNION ALL per pooled connection. The
+# default matches the compliance_db_pool slots so the probes never hold more
+# backends than the pool admits. The retention_identify_max_workers Variable
+# can lower it further; it never goes above the slots the task holds
+IDENTIFY_MAX_WORKERS = 2
+
+# Rows deleted per transaction when purging expired data
+DELETE_BATCH_SIZE = 10000
+
+# Rows anonymized per transaction ahead of deletion
+ANONYMIZE_BATCH_SIZE = 5000
+
+# Time-series tables that may be range-partitioned on created_at; fully
+# expired partitions are detached and dropped instead of row-deleted
+DROP_PARTITION_TABLES = {'session_data', 'cache_data', 'temp_files', 'user_activity_logs'}
+
+# How long a cached scan stays valid for retries of the same logical run
+SCAN_CACHE_TTL = timedelta(hours=6)
+
+@dataclass
+class RetentionState:
+    """Retention run state handed between tasks as a single XCom"""
+    
+    expired: dict = field(default_factory=dict)
+    held: dict = field(default_factory=dict)
+    filtered: dict = field(default_factory=dict)
+    anon: dict = field(default_factory=dict)
+    manifest_id: Optional[int] = None
+    deleted: dict = field(default_factory=dict)
+
+def pull_state(context, task_id):
+    """Pull the retention state pushed by an upstream task"""
+    
+    state = context['task_instance'].xcom_pull(task_ids=task_id, key='state')
+    
+    return RetentionState(**state) if state else RetentionState()
+
+def push_state(context, state):
+    """Push the retention state for downstream tasks"""
+    
+    context['task_instance'].xcom_push(key='state', value=asdict(state))
+
+def scan_cache_key(context, inputs):
+    """Hash the logical run timestamp and scan inputs into a cache key"""
+    
+    payload = json.dumps({'exec': context['ts'], 'inputs': inputs}, sort_keys=True)
+    
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_cached_scan(task_name, cache_key):
+    """Return the cached result for a scan if the key matches and it is fresh"""
+    
+    cached = Variable.get(f"retention_scan_cache_{task_name}", default_var=None, deserialize_json=True)
+    
+    if not cached or cached.get('key') != cache_key:
+        return None
+    
+    if datetime.now() - datetime.fromisoformat(cached['cached_at']) > SCAN_CACHE_TTL:
+        return None
+    
+    logging.info(f"Using cached {task_name} result for key {cache_key}")
+    
+    return cached['result']
+
+def set_cached_scan(task_name, cache_key, result):
+    """Cache a scan result so retries within the same run can skip it"""
+    
+    Variable.set(
+        f"retention_scan_cache_{task_name}",
+        {
+            'key': cache_key,
+            'cached_at': datetime.now().isoformat(),
+            'result': result
+        },
+        serialize_json=True
+    )
+
+# Fields that need anonymization before deletion
+ANONYMIZATION_CONFIG = {
+    'user_profiles': ['email', 'first_name', 'last_name', 'phone', 'address'],
+    'user_activity_logs': ['user_id', 'ip_address', 'user_agent'],
+    'transaction_logs': ['user_id', 'payment_method', 'billing_address'],
+    'support_tickets': ['user_id', 'email', 'phone', 'description']
+}
+
+def anonymized_value(field):
+    """SQL expression used to overwrite a field during anonymization"""
+    
+    if field in ['email']:
+        return sql.SQL("'anonymized_' || gen_random_uuid() || '@deleted.local'")
+    elif field in ['first_name', 'last_name']:
+        return sql.Literal('DELETED')
+    elif field in ['phone']:
+        return sql.Literal('000-000-0000')
+    elif field in ['ip_address']:
+        return sql.Literal('0.0.0.0')
+    
+    return sql.Literal('ANONYMIZED')
+
+# Retention SQL is composed once at import with quoted identifiers; the
+# retention cutoff is always bound as a parameter so the statement text
+# is identical on every run. The table label keys each row when the probes
+# are combined with UNION ALL
+IDENTIFY_SQLS = {
+    table_name: sql.SQL("""
+    SELECT {table_label} as table_name,
+           COUNT(*) as expired_count,
+           MIN(created_at) as oldest_record,
+           MAX(created_at) as newest_expired
+    FROM {table}
+    WHERE created_at < %s
+    """).format(table_label=sql.Literal(table_name), table=sql.Identifier(table_name))
+    for table_name in RETENTION_POLICIES
+}
+
+# A ctid is only unique within one partition, so batches match on
+# (tableoid, ctid) and repeat the cutoff on the outer statement
+PREPARE_DELETE_SQLS = {
+    table_name: sql.SQL("""
+    PREPARE {statement} (timestamptz, int) AS
+    DELETE FROM {table}
+    WHERE created_at < $1
+    AND (tableoid, ctid) IN (
+        SELECT tableoid, ctid FROM {table}
+        WHERE created_at < $1
+        LIMIT $2
+    )
+    """).format(
+        statement=sql.Identifier(f"retention_delete_{table_name}"),
+        table=sql.Identifier(table_name)
+    )
+    for table_name in RETENTION_POLICIES
+}
+
+EXECUTE_DELETE_SQLS = {
+    table_name: sql.SQL("EXECUTE {statement} (%s, %s)").format(
+        statement=sql.Identifier(f"retention_delete_{table_name}")
+    )
+    for table_name in RETENTION_POLICIES
+}
+
+# Retention indexes as (table, index name suffix, index body). BRIN summaries
+# on created_at keep retention range scans to the matching block ranges of
+# these append-mostly tables at a tiny index size; partial indexes over rows
+# still awaiting anonymization let batched anonymization and its retries
+# only visit rows that need the UPDATE
+RETENTION_INDEXES = [
+    (table_name, 'created_at_brin', sql.SQL("USING BRIN (created_at)"))
+    for table_name in RETENTION_POLICIES
+] + [
+    (table_name, 'needs_anon', sql.SQL("(created_at) WHERE anonymized_at IS NULL"))
+    for table_name in ANONYMIZATION_CONFIG
+]
+
+# Relation kind of a table ('r' plain, 'p' partitioned)
+RELKIND_SQL = "SELECT relkind FROM pg_class WHERE oid = %s::regclass"
+
+# Validity of an existing index in the table's schema (no row if missing)
+INDEX_VALID_SQL = """
+SELECT pg_index.indisvalid
+FROM pg_class idx
+JOIN pg_index ON pg_index.indexrelid = idx.oid
+WHERE idx.relname = %s
+AND idx.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = %s::regclass)
+"""
+
+# Leaf partitions of a partitioned table that have no index attached to the
+# given parent index yet. Partitions created after the parent index exists
+# get one automatically (under a generated name), so they are left alone
+UNINDEXED_PARTITIONS_SQL = """
+SELECT child_ns.nspname, child.relname
+FROM pg_inherits
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+JOIN pg_namespace child_ns ON child_ns.oid = child.relnamespace
+WHERE pg_inherits.inhparent = %(table)s::regclass
+AND child.relkind = 'r'
+AND NOT EXISTS (
+    SELECT 1
+    FROM pg_inherits index_inh
+    JOIN pg_index child_index ON child_index.indexrelid = index_inh.inhrelid
+    JOIN pg_class parent_index ON parent_index.oid = index_inh.inhparent
+    WHERE parent_index.relname = %(index)s
+    AND parent_index.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = %(table)s::regclass)
+    AND child_index.indrelid = child.oid
+)
+ORDER BY child.relname
+"""
+
+# Range partitions whose upper bound is at or before the retention cutoff,
+# with the planner's row estimate so no partition has to be scanned, and
+# whether an interrupted DETACH ... CONCURRENTLY left the detach pending
+EXPIRED_PARTITIONS_SQL = """
+SELECT child_ns.nspname, child.relname, GREATEST(child.reltuples, 0)::bigint,
+    pg_inherits.inhdetachpending
+FROM pg_inherits
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+JOIN pg_namespace child_ns ON child_ns.oid = child.relnamespace
+WHERE pg_inherits.inhparent = %s::regclass
+AND (regexp_match(pg_get_expr(child.relpartbound, child.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz
+    <= %s
+ORDER BY child.relname
+"""
+
+# Invalid indexes left on a table by a failed REINDEX CONCURRENTLY
+REINDEX_LEFTOVERS_SQL = """
+SELECT idx_ns.nspname, idx.relname
+FROM pg_index
+JOIN pg_class idx ON idx.oid = pg_index.indexrelid
+JOIN pg_namespace idx_ns ON idx_ns.oid = idx.relnamespace
+WHERE pg_index.indrelid = %s::regclass
+AND NOT pg_index.indisvalid
+AND idx.relname ~ '_ccnew[0-9]*$'
+"""
+
+# Whether the partitioned table has a DEFAULT partition
+HAS_DEFAULT_PARTITION_SQL = """
+SELECT partdefid <> 0 FROM pg_partitioned_table WHERE partrelid = %s::regclass
+"""
+
+# Same (tableoid, ctid) matching as the batch DELETE, so anonymization never
+# touches unexpired rows in sibling partitions
+ANONYMIZE_SQLS = {
+    table_name: sql.SQL("""
+    UPDATE {table}
+    SET {assignments},
+        anonymized_at = NOW(),
+        anonymization_reason = 'DATA_RETENTION_POLICY'
+    WHERE created_at < %(cutoff)s
+    AND anonymized_at IS NULL
+    AND (tableoid, ctid) IN (
+        SELECT tableoid, ctid FROM {table}
+        WHERE created_at < %(cutoff)s
+        AND anonymized_at IS NULL
+        LIMIT %(batch_size)s
+    )
+    """).format(
+        table=sql.Identifier(table_name),
+        assignments=sql.SQL(', ').join(
+            sql.SQL("{} = {}").format(sql.Identifier(field), anonymized_value(field))
+            for field in fields
+        )
+    )
+    for table_name, fields in ANONYMIZATION_CONFIG.items()
+}
+
+def drop_expired_partitions(conn, table_name, cutoff):
+    """Detach and drop partitions of a table that are entirely past retention"""
+    
+    result = {
+        'partitions_dropped': [],
+        'estimated_partition_records': 0,
+        'partitions_detached_not_dropped': [],
+        'partition_errors': []
+    }
+    
+    # DETACH PARTITION CONCURRENTLY cannot run inside a transaction block, so
+    # every partition is detached and dropped in its own autocommit step
+    conn.autocommit = True
+    
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(HAS_DEFAULT_PARTITION_SQL, [table_name])
+            row = cursor.fetchone()
+            
+            # Tables that are not partitioned have nothing to drop
+            if row is None:
+                return result
+            
+            # DETACH ... CONCURRENTLY is rejected when the parent has a DEFAULT
+            # partition, so those tables take the brief exclusive lock instead
+            detach_sql = (
+                "ALTER TABLE {} DETACH PARTITION {}" if row[0]
+                else "ALTER TABLE {} DETACH PARTITION {} CONCURRENTLY"
+            )
+            
+            cursor.execute(EXPIRED_PARTITIONS_SQL, [table_name, cutoff])
+            partitions = cursor.fetchall()
+            
+            for schema_name, partition_name, partition_records, detach_pending in partitions:
+                partition = sql.Identifier(schema_name, partition_name)
+                
+                # An interrupted concurrent detach can only be completed with
+                # FINALIZE; issuing DETACH again would fail on every run
+                try:
+                    cursor.execute(
+                        sql.SQL(
+                            "ALTER TABLE {} DETACH PARTITION {} FINALIZE" if detach_pending
+                            else detach_sql
+                        ).format(sql.Identifier(table_name), partition)
+                    )
+                except Exception as e:
+                    logging.error(f"Could not detach partition {partition_name} of {table_name}: {str(e)}")
+                    result['partition_errors'].append(f"{partition_name}: {str(e)}")
+                    break
+                
+                # A detached partition is no longer found through pg_inherits,
+                # so a failed DROP is reported rather than left behind silently
+                try:
+                    cursor.execute(sql.SQL("DROP TABLE {}").format(partition))
+                except Exception as e:
+                    logging.error(
+                        f"Detached partition {partition_name} of {table_name} "
+                        f"but could not drop it: {str(e)}"
+                    )
+                    result['partitions_detached_not_dropped'].append(partition_name)
+                    result['partition_errors'].append(f"{partition_name}: {str(e)}")
+                    break
+                
+                result['partitions_dropped'].append(partition_name)
+                result['estimated_partition_records'] += partition_records
+                
+                logging.info(
+                    f"Dropped partition {partition_name} of {table_name} "
+                    f"(~{partition_records} records, estimated from reltuples)"
+                )
+    finally:
+        conn.autocommit = False
+    
+    return result
+
+def probe_expired_data(pool, cutoffs):
+    """Probe a group of retention tables in one UNION ALL on a pooled connection"""
+    
+    conn = pool.getconn()
+    
+    try:
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(
+                    sql.SQL(" UNION ALL ").join(IDENTIFY_SQLS[table_name] for table_name in cutoffs),
+                    list(cutoffs.values())
+                )
+                rows = cursor.fetchall()
+            except Exception as e:
+                # One missing or broken table fails the whole UNION ALL, so fall
+                # back to probing the group table by table and skip only those
+                conn.rollback()
+                logging.warning(f"Error checking {', '.join(cutoffs)} together, checking one by one: {str(e)}")
+                rows = []
+                
+                for table_name, cutoff in cutoffs.items():
+                    try:
+                        cursor.execute(IDENTIFY_SQLS[table_name], [cutoff])
+                        rows.append(cursor.fetchone())
+                    except Exception as e:
+                        conn.rollback()
+                        logging.error(f"Error checking {table_name}: {str(e)}")
+        
+        return {row[0]: row[1:] for row in rows}
+    finally:
+        pool.putconn(conn)
+
+def build_index_concurrently(cursor, schema_name, table_name, index_name, body):
+    """Create an index concurrently, rebuilding it if a failed build left it invalid"""
+    
+    # Plain tables are resolved through search_path like everywhere else;
+    # partitions carry the schema reported by pg_inherits
+    names = (schema_name,) if schema_name else ()
+    table = sql.Identifier(*names, table_name)
+    index = sql.Identifier(*names, index_name)
+    
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind that
+    # IF NOT EXISTS would then skip forever, so drop it and build again
+    cursor.execute(INDEX_VALID_SQL, [index_name, table.as_string(cursor)])
+    row = cursor.fetchone()
+    
+    if row is not None and not row[0]:
+        logging.warning(f"Rebuilding invalid index {index_name} on {table_name}")
+        cursor.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(index))
+    
+    cursor.execute(
+        sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} {}").format(
+            sql.Identifier(index_name), table, body
+        )
+    )
+
+def ensure_retention_indexes(**context):
+    """Create the indexes used by the retention scans and anonymization"""
+    
+    postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn = postgres_hook.get_conn()
+    conn.autocommit = True
+    
+    try:
+        with conn.cursor() as cursor:
+            for table_name, suffix, body in RETENTION_INDEXES:
+                index_name = f"{table_name}_{suffix}"
+                
+                try:
+                    cursor.execute(RELKIND_SQL, [table_name])
+                    relkind = cursor.fetchone()[0]
+                    
+                    if relkind != 'p':
+                        build_index_concurrently(cursor, None, table_name, index_name, body)
+                        continue
+                    
+                    # Partitioned parents reject CONCURRENTLY, so the parent index
+                    # is created ON ONLY the parent (metadata, left invalid) and
+                    # becomes valid once every partition's index is attached
+                    cursor.execute(
+                        sql.SQL("CREATE INDEX IF NOT EXISTS {} ON ONLY {} {}").format(
+                            sql.Identifier(index_name), sql.Identifier(table_name), body
+                        )
+                    )
+                    
+                    # Only partitions still missing an attached index are built,
+                    # so daily runs never duplicate an auto-created one
+                    cursor.execute(
+                        UNINDEXED_PARTITIONS_SQL, {'table': table_name, 'index': index_name}
+                    )
+                    partitions = cursor.fetchall()
+                    
+                    for schema_name, partition_name in partitions:
+                        partition_index = f"{partition_name}_{suffix}"
+                        
+                        build_index_concurrently(
+                            cursor, schema_name, partition_name, partition_index, body
+                        )
+                        cursor.execute(
+                            sql.SQL("ALTER INDEX {} ATTACH PARTITION {}").format(
+                                sql.Identifier(index_name),
+                                sql.Identifier(schema_name, partition_index)
+                            )
+                        )
+                except Exception as e:
+                    logging.error(f"Error creating retention index on {table_name}: {str(e)}")
+    finally:
+        conn.close()
+
 def identify_expired_data(**context):
     """Identify data that has exceeded retention periods"""
     
+    cache_key = scan_cache_key(context, RETENTION_POLICIES)
+    expired_data = get_cached_scan('identify_expired_data', cache_key)
+    
+    if expired_data is not None:
+        push_state(context, RetentionState(expired=expired_data))
+        return expired_data
+    
     postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
     
-    # Define retention policies
-    retention_policies = {
-        'user_activity_logs': 90,      # 90 days
-        'session_data': 30,            # 30 days
-        'audit_logs': 2555,            # 7 years
-        'user_profiles': 1095,         # 3 years after account deletion
-        'transaction_logs': 2555,      # 7 years
-        'marketing_data': 365,         # 1 year
-        'support_tickets': 1095,       # 3 years
-        'backup_data': 365,            # 1 year
-        'temp_files': 7,               # 7 days
-        'cache_data': 1                # 1 day
+    # One fixed cutoff per table for the whole run, so every downstream
+    # statement works against the same expired set regardless of retries
+    cutoffs = {
+        table_name: context['data_interval_end'] - timedelta(days=retention_days)
+        for table_name, retention_days in RETENTION_POLICIES.items()
     }
     
     expired_data = {}
     
-    for table_name, retention_days in retention_policies.items():
-        try:
-            # Query to find expired records
-            sql = f"""
-            SELECT COUNT(*) as expired_count,
-                   MIN(created_at) as oldest_record,
-                   MAX(created_at) as newest_expired
-            FROM {table_name}
-            WHERE created_at < NOW() - INTERVAL '{retention_days} days'
-            """
-            
-            result = postgres_hook.get_first(sql)
-            
-            if result and result[0] > 0:
-                expired_data[table_name] = {
-                    'count': result[0],
-                    'oldest_record': result[1].isoformat() if result[1] else None,
-                    'newest_expired': result[2].isoformat() if result[2] else None,
-                    'retention_days': retention_days
-                }
-                
-                logging.info(f"Found {result[0]} expired records in {table_name}")
+    max_workers = max(1, min(
+        int(Variable.get('retention_identify_max_workers', default_var=IDENTIFY_MAX_WORKERS)),
+        IDENTIFY_MAX_WORKERS
+    ))
+    
+    # The pool is created per run, not at import, so DAG parsing never
+    # opens database connections. It is built from the connection fields
+    # rather than get_uri(), whose extras (cursor, iam, ...) libpq rejects
+    connection = postgres_hook.get_connection('compliance_db')
+    connect_kwargs = {
+        'host': connection.host,
+        'port': connection.port,
+        'user': connection.login,
+        'password': connection.password,
+        'dbname': connection.schema
+    }
+    if connection.extra_dejson.get('sslmode'):
+        connect_kwargs['sslmode'] = connection.extra_dejson['sslmode']
+    
+    pool = ThreadedConnectionPool(1, max_workers, **connect_kwargs)
+    results = {}
+    
+    try:
+        # Split the tables over the pooled connections so each sends a single
+        # UNION ALL round trip and those round trips overlap
+        table_names = list(cutoffs)
+        groups = [
+            {table_name: cutoffs[table_name] for table_name in table_names[worker::max_workers]}
+            for worker in range(max_workers)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(probe_expired_data, pool, group)
+                for group in groups if group
+            ]
             
-        except Exception as e:
-            logging.error(f"Error checking {table_name}: {str(e)}")
+            for future in as_completed(futures):
+                results.update(future.result())
+    except Exception as e:
+        logging.error(f"Error checking retention tables: {str(e)}")
+        raise
+    finally:
+        pool.closeall()
+    
+    # Keep policy order so the result does not depend on completion order
+    for table_name in RETENTION_POLICIES:
+        # Tables whose probe failed were logged and are skipped this run
+        if table_name not in results:
+            continue
+        
+        expired_count, oldest_record, newest_expired = results[table_name]
+        
+        if not expired_count:
+            continue
+        
+        expired_data[table_name] = {
+            'count': expired_count,
+            'oldest_record': oldest_record.isoformat() if oldest_record else None,
+            'newest_expired': newest_expired.isoformat() if newest_expired else None,
+            'retention_days': RETENTION_POLICIES[table_name],
+            'cutoff': cutoffs[table_name].isoformat()
+        }
+        
+        logging.info(f"Found {expired_count} expired records in {table_name}")
+    
+    set_cached_scan('identify_expired_data', cache_key, expired_data)
     
     # Store results for downstream tasks
-    context['task_instance'].xcom_push(key='expired_data', value=expired_data)
+    push_state(context, RetentionState(expired=expired_data))
     
     return expired_data
 
+def has_expired_data(**context):
+    """Short-circuit the deletion chain when nothing has expired"""
+    
+    return bool(pull_state(context, 'identify_expired_data').expired)
+
 def check_legal_holds(**context):
     """Check for legal holds that prevent data deletion"""
     
+    state = pull_state(context, 'identify_expired_data')
+    expired_data = state.expired
+    
+    # Holds are always read live: a hold placed before a retry must apply
     postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
-    expired_data = context['task_instance'].xcom_pull(key='expired_data')
     
     legal_holds = {}
+    filtered_expired_data = {}
     
-    # Query active legal holds
-    sql = """
-    SELECT table_name, record_id, hold_reason, created_by, created_at
-    FROM legal_holds
-    WHERE status = 'ACTIVE'
-    AND (expiration_date IS NULL OR expiration_date > NOW())
-    """
-    
-    holds = postgres_hook.get_records(sql)
+    if not expired_data:
+        held_tables = set()
+    else:
+        # Only ask for distinct held tables among those with expired data
+        held_sql = """
+        SELECT DISTINCT table_name
+        FROM legal_holds
+        WHERE status = 'ACTIVE'
+        AND (expiration_date IS NULL OR expiration_date > NOW())
+        AND table_name = ANY(%s)
+        """
+        
+        held_tables = {
+            row[0] for row in postgres_hook.get_records(held_sql, parameters=[list(expired_data)])
+        }
     
-    for hold in holds:
-        table_name, record_id, reason, created_by, created_at = hold
+    if held_tables:
+        # Hold details are only needed for tables that are actually held
+        holds_sql = """
+        SELECT table_name, record_id, hold_reason, created_by, created_at
+        FROM legal_holds
+        WHERE status = 'ACTIVE'
+        AND (expiration_date IS NULL OR expiration_date > NOW())
+        AND table_name = ANY(%s)
+        """
         
-        if table_name not in legal_holds:
-            legal_holds[table_name] = []
+        holds = postgres_hook.get_records(holds_sql, parameters=[list(held_tables)])
         
-        legal_holds[table_name].append({
-            'record_id': record_id,
-            'reason': reason,
-            'created_by': created_by,
-            'created_at': created_at.isoformat()
-        })
+        for hold in holds:
+            table_name, record_id, reason, created_by, created_at = hold
+            
+            legal_holds.setdefault(table_name, []).append({
+                'record_id': record_id,
+                'reason': reason,
+                'created_by': created_by,
+                'created_at': created_at.isoformat()
+            })
     
     # Filter expired data to exclude records under legal hold
-    filtered_expired_data = {}
-    
     for table_name, data in expired_data.items():
-        if table_name in legal_holds:
+        if table_name in held_tables:
             logging.warning(f"Legal hold exists for {table_name}, skipping deletion")
             continue
         
         filtered_expired_data[table_name] = data
     
-    context['task_instance'].xcom_push(key='filtered_expired_data', value=filtered_expired_data)
-    context['task_instance'].xcom_push(key='legal_holds', value=legal_holds)
+    state.filtered = filtered_expired_data
+    state.held = legal_holds
+    push_state(context, state)
     
     return filtered_expired_data
 
-def anonymize_before_deletion(**context):
-    """Anonymize data before deletion for compliance"""
-    
-    postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
-    filtered_data = context['task_instance'].xcom_pull(key='filtered_expired_data')
+def anonymize_before_deletion(state):
+    """Plan the batched anonymization that execute_data_deletion commits before each delete"""
     
     anonymization_results = {}
     
-    # Define fields that need anonymization before deletion
-    anonymization_config = {
-        'user_profiles': ['email', 'first_name', 'last_name', 'phone', 'address'],
-        'user_activity_logs': ['user_id', 'ip_address', 'user_agent'],
-        'transaction_logs': ['user_id', 'payment_method', 'billing_address'],
-        'support_tickets': ['user_id', 'email', 'phone', 'description']
-    }
-    
-    for table_name, data in filtered_data.items():
-        if table_name in anonymization_config:
-            fields_to_anonymize = anonymization_config[table_name]
-            
-            try:
-                # Create anonymization SQL
-                set_clauses = []
-                for field in fields_to_anonymize:
-                    if field in ['email']:
-                        set_clauses.append(f"{field} = 'anonymized_' || generate_random_uuid() || '@deleted.local'")
-                    elif field in ['first_name', 'last_name']:
-                        set_clauses.append(f"{field} = 'DELETED'")
-                    elif field in ['phone']:
-                        set_clauses.append(f"{field} = '000-000-0000'")
-                    elif field in ['ip_address']:
-                        set_clauses.append(f"{field} = '0.0.0.0'")
-                    else:
-                        set_clauses.append(f"{field} = 'ANONYMIZED'")
-                
-                if set_clauses:
-                    retention_days = data['retention_days']
-                    sql = f"""
-                    UPDATE {table_name}
-                    SET {', '.join(set_clauses)},
-                        anonymized_at = NOW(),
-                        anonymization_reason = 'DATA_RETENTION_POLICY'
-                    WHERE created_at < NOW() - INTERVAL '{retention_days} days'
-                    AND anonymized_at IS NULL
-                    """
-                    
-                    result = postgres_hook.run(sql)
-                    
-                    anonymization_results[table_name] = {
-                        'anonymized': True,
-                        'fields': fields_to_anonymize,
-                        'sql_executed': sql
-                    }
-                    
-                    logging.info(f"Anonymized expired records in {table_name}")
-                
-            except Exception as e:
-                logging.error(f"Error anonymizing {table_name}: {str(e)}")
-                anonymization_results[table_name] = {
-                    'anonymized': False,
-                    'error': str(e)
-                }
+    for table_name in state.filtered:
+        if table_name in ANONYMIZE_SQLS:
+            # Executed by execute_data_deletion in committed batches on the
+            # deletion session, always ahead of the delete for that table
+            anonymization_results[table_name] = {
+                'anonymized': True,
+                'fields': ANONYMIZATION_CONFIG[table_name]
+            }
     
-    context['task_instance'].xcom_push(key='anonymization_results', value=anonymization_results)
+    state.anon = anonymization_results
     
     return anonymization_results
 
-def create_deletion_manifest(**context):
-    """Create manifest of data to be deleted for audit purposes"""
+def build_deletion_manifest(state):
+    """Build the manifest of data to be deleted for audit purposes"""
     
-    filtered_data = context['task_instance'].xcom_pull(key='filtered_expired_data')
-    anonymization_results = context['task_instance'].xcom_pull(key='anonymization_results')
+    filtered_data = state.filtered
+    anonymization_results = state.anon
     
     manifest = {
         'deletion_date': datetime.now().isoformat(),
@@ -222,6 +692,7 @@ def create_deletion_manifest(**context):
             'table_name': table_name,
             'records_to_delete': data['count'],
             'retention_period_days': data['retention_days'],
+            'cutoff': data['cutoff'],
             'oldest_record': data['oldest_record'],
             'newest_expired': data['newest_expired'],
             'anonymized_before_deletion': table_name in anonymization_results
@@ -230,8 +701,10 @@ def create_deletion_manifest(**context):
         manifest['tables_affected'].append(table_info)
         manifest['total_records_to_delete'] += data['count']
     
-    # Store manifest in database for audit trail
-    postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
+    return manifest
+
+def insert_deletion_manifest(cursor, manifest):
+    """Store the manifest and its per-table audit rows, returning its id"""
     
     insert_sql = """
     INSERT INTO data_deletion_manifests (
@@ -240,111 +713,208 @@ def create_deletion_manifest(**context):
     RETURNING id
     """
     
-    manifest_id = postgres_hook.get_first(
+    # One audit row per affected table, streamed in a single COPY
+    audit_sql = """
+    COPY data_deletion_audit (
+        manifest_id, table_name, records, retention_days, oldest, newest
+    ) FROM STDIN WITH CSV
+    """
+    
+    cursor.execute(
         insert_sql,
-        parameters=[
+        [
             datetime.now(),
             json.dumps(manifest),
             manifest['total_records_to_delete'],
             'PENDING'
         ]
-    )[0]
-    
-    manifest['manifest_id'] = manifest_id
+    )
+    manifest_id = cursor.fetchone()[0]
     
-    context['task_instance'].xcom_push(key='deletion_manifest', value=manifest)
+    if manifest['tables_affected']:
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        
+        for table_info in manifest['tables_affected']:
+            writer.writerow([
+                manifest_id,
+                table_info['table_name'],
+                table_info['records_to_delete'],
+                table_info['retention_period_days'],
+                table_info['oldest_record'],
+                table_info['newest_expired']
+            ])
+        
+        csv_buffer.seek(0)
+        cursor.copy_expert(audit_sql, csv_buffer)
     
-    return manifest
+    return manifest_id
 
-def execute_data_deletion(**context):
-    """Execute the actual data deletion"""
+def execute_data_deletion(state):
+    """Record the deletion manifest and execute the actual data deletion"""
     
     postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
-    filtered_data = context['task_instance'].xcom_pull(key='filtered_expired_data')
-    manifest = context['task_instance'].xcom_pull(key='deletion_manifest')
+    filtered_data = state.filtered
+    anonymization_results = state.anon
     
     deletion_results = {}
     total_deleted = 0
     
-    for table_name, data in filtered_data.items():
-        try:
-            retention_days = data['retention_days']
-            
-            # Execute deletion
-            delete_sql = f"""
-            DELETE FROM {table_name}
-            WHERE created_at < NOW() - INTERVAL '{retention_days} days'
-            """
-            
-            # Get count before deletion for verification
-            count_sql = f"""
-            SELECT COUNT(*) FROM {table_name}
-            WHERE created_at < NOW() - INTERVAL '{retention_days} days'
-            """
-            
-            records_to_delete = postgres_hook.get_first(count_sql)[0]
+    update_sql = """
+    UPDATE data_deletion_manifests
+    SET status = %s, deletion_results = %s, actual_deletions = %s, completed_at = NOW()
+    WHERE id = %s
+    """
+    
+    conn = postgres_hook.get_conn()
+    conn.autocommit = False
+    cursor = conn.cursor()
+    
+    try:
+        # The manifest is written on the deletion session and committed
+        # before any row is removed, so every deletion has an audit record
+        state.manifest_id = insert_deletion_manifest(cursor, build_deletion_manifest(state))
+        conn.commit()
+        
+        for table_name, data in filtered_data.items():
+            cutoff = datetime.fromisoformat(data['cutoff'])
+            table_deleted = 0
+            partition_result = {}
             
-            if records_to_delete > 0:
-                postgres_hook.run(delete_sql)
+            try:
+                # Whole expired partitions are dropped as metadata; the row
+                # DELETE below only handles what is left (or unpartitioned data).
+                # Their reltuples estimates are kept apart from actual_deletions,
+                # which only ever holds exact rowcounts
+                if table_name in DROP_PARTITION_TABLES:
+                    partition_result = drop_expired_partitions(conn, table_name, cutoff)
+                    
+                    if partition_result['partition_errors']:
+                        raise Exception(
+                            "Error dropping expired partitions: "
+                            + "; ".join(partition_result['partition_errors'])
+                        )
+                
+                # Anonymize in bounded, committed batches before deleting, so
+                # row locks stay small and a retry skips rows already done
+                anonymization = anonymization_results.get(table_name)
+                if anonymization and anonymization.get('anonymized'):
+                    table_anonymized = 0
+                    
+                    while True:
+                        cursor.execute(
+                            ANONYMIZE_SQLS[table_name],
+                            {'cutoff': cutoff, 'batch_size': ANONYMIZE_BATCH_SIZE}
+                        )
+                        anonymized = cursor.rowcount
+                        conn.commit()
+                        
+                        table_anonymized += anonymized
+                        
+                        if anonymized < ANONYMIZE_BATCH_SIZE:
+                            break
+                    
+                    logging.info(f"Anonymized {table_anonymized} expired records in {table_name}")
                 
-                # Verify deletion
-                remaining_count = postgres_hook.get_first(count_sql)[0]
-                actual_deleted = records_to_delete - remaining_count
+                # Delete in bounded batches, committing each one, so lock and WAL
+                # footprint stay small and a failure only rolls back one batch.
+                # The batch statement is prepared once per table and re-executed
+                # on this session, so it is parsed and planned only once
+                cursor.execute(PREPARE_DELETE_SQLS[table_name])
+                
+                while True:
+                    cursor.execute(
+                        EXECUTE_DELETE_SQLS[table_name],
+                        [cutoff, DELETE_BATCH_SIZE]
+                    )
+                    deleted = cursor.rowcount
+                    conn.commit()
+                    
+                    table_deleted += deleted
+                    
+                    if deleted < DELETE_BATCH_SIZE:
+                        break
                 
                 deletion_results[table_name] = {
-                    'expected_deletions': records_to_delete,
-                    'actual_deletions': actual_deleted,
-                    'success': remaining_count == 0,
-                    'remaining_records': remaining_count
+                    'expected_deletions': data['count'],
+                    'actual_deletions': table_deleted,
+                    **partition_result,
+                    'success': True
                 }
                 
-                total_deleted += actual_deleted
+                logging.info(f"Deleted {table_deleted} records from {table_name}")
                 
-                logging.info(f"Deleted {actual_deleted} records from {table_name}")
-            else:
+                # rowcount is exact, so without dropped partitions (whose rows it
+                # does not include) a mismatch only means the expired set
+                # changed between identify_expired_data and this delete
+                if table_deleted != data['count'] and not partition_result.get('partitions_dropped'):
+                    logging.warning(
+                        f"Deleted {table_deleted} records from {table_name}, "
+                        f"expected {data['count']} from identify_expired_data"
+                    )
+            
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"Error deleting from {table_name}: {str(e)}")
                 deletion_results[table_name] = {
-                    'expected_deletions': 0,
-                    'actual_deletions': 0,
-                    'success': True,
-                    'remaining_records': 0
+                    'actual_deletions': table_deleted,
+                    **partition_result,
+                    'success': False,
+                    'error': str(e)
                 }
+            
+            total_deleted += table_deleted
         
-        except Exception as e:
-            logging.error(f"Error deleting from {table_name}: {str(e)}")
-            deletion_results[table_name] = {
-                'success': False,
-                'error': str(e)
-            }
-    
-    # Update manifest with results
-    update_sql = """
-    UPDATE data_deletion_manifests
-    SET status = %s, deletion_results = %s, actual_deletions = %s, completed_at = NOW()
-    WHERE id = %s
-    """
-    
-    status = 'COMPLETED' if all(r.get('success', False) for r in deletion_results.values()) else 'PARTIAL'
-    
-    postgres_hook.run(
-        update_sql,
-        parameters=[
-            status,
-            json.dumps(deletion_results),
-            total_deleted,
-            manifest['manifest_id']
-        ]
-    )
+        # Update manifest with results
+        status = 'COMPLETED' if all(r.get('success', False) for r in deletion_results.values()) else 'PARTIAL'
+        
+        cursor.execute(
+            update_sql,
+            [
+                status,
+                json.dumps(deletion_results),
+                total_deleted,
+                state.manifest_id
+            ]
+        )
+        conn.commit()
+    except Exception:
+        # Never leave a PENDING manifest behind when the task itself fails. The
+        # update records what was deleted before the failure, and its own
+        # errors are only logged so the original exception is what propagates
+        if state.manifest_id is not None:
+            try:
+                conn.rollback()
+                cursor.execute(
+                    update_sql,
+                    [
+                        'FAILED',
+                        json.dumps(deletion_results),
+                        total_deleted,
+                        state.manifest_id
+                    ]
+                )
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Error marking manifest {state.manifest_id} as FAILED: {str(e)}")
+        
+        raise
+    finally:
+        cursor.close()
+        conn.close()
     
-    context['task_instance'].xcom_push(key='deletion_results', value=deletion_results)
+    # Detailed results live on the manifest row; only counts go via XCom
+    state.deleted = {
+        table_name: result.get('actual_deletions', 0)
+        for table_name, result in deletion_results.items()
+    }
     
     return deletion_results
 
-def generate_compliance_report(**context):
+def generate_compliance_report(state, deletion_results):
     """Generate compliance report for the retention process"""
     
-    manifest = context['task_instance'].xcom_pull(key='deletion_manifest')
-    deletion_results = context['task_instance'].xcom_pull(key='deletion_results')
-    legal_holds = context['task_instance'].xcom_pull(key='legal_holds')
+    legal_holds = state.held
     
     report = {
         'report_date': datetime.now().isoformat(),
@@ -359,7 +929,7 @@ def generate_compliance_report(**context):
             'total_holds': sum(len(holds) for holds in legal_holds.values())
         },
         'compliance_status': 'COMPLIANT' if all(r.get('success', False) for r in deletion_results.values()) else 'NEEDS_ATTENTION',
-        'manifest_id': manifest['manifest_id'],
+        'manifest_id': state.manifest_id,
         'detailed_results': deletion_results
     }
     
@@ -386,65 +956,161 @@ def generate_compliance_report(**context):
     
     return report
 
-def send_compliance_notification(**context):
-    """Send notification about retention process completion"""
-    
-    report = context['task_instance'].xcom_pull(task_ids='generate_compliance_report')
+def build_compliance_notification(report):
+    """Build the notification payload for a compliance report"""
     
-    # Prepare notification payload
-    notification_data = {
+    return {
         'subject': f"Data Retention Process Completed - {report['compliance_status']}",
         'summary': report['process_summary'],
         'compliance_status': report['compliance_status'],
         'report_date': report['report_date'],
         'manifest_id': report['manifest_id']
     }
+
+def finalize_retention(**context):
+    """Plan anonymization, delete expired data and report, as one task"""
+    
+    state = pull_state(context, 'check_legal_holds')
+    step_timings = {}
+    
+    # Strictly sequential steps on the same resource; running them in one
+    # task saves scheduler work, and per-step timings keep the visibility
+    started = time.monotonic()
+    anonymize_before_deletion(state)
+    step_timings['anonymize_before_deletion'] = round(time.monotonic() - started, 3)
+    
+    started = time.monotonic()
+    deletion_results = execute_data_deletion(state)
+    step_timings['execute_data_deletion'] = round(time.monotonic() - started, 3)
     
-    # This would typically send to your notification service
-    logging.info(f"Compliance notification: {notification_data}")
+    started = time.monotonic()
+    report = generate_compliance_report(state, deletion_results)
+    step_timings['generate_compliance_report'] = round(time.monotonic() - started, 3)
     
-    return notification_data
+    logging.info(f"Retention step timings (seconds): {step_timings}")
+    
+    push_state(context, state)
+    
+    # Sent by send_compliance_notification, which defers the HTTP call
+    context['task_instance'].xcom_push(
+        key='notification',
+        value=build_compliance_notification(report)
+    )
+    context['task_instance'].xcom_push(key='step_timings', value=step_timings)
+    
+    return report['compliance_status']
 
-# Task definitions
-identify_expired_task = PythonOperator(
-    task_id='identify_expired_data',
-    python_callable=identify_expired_data,
-    dag=dag
-)
+def drop_reindex_leftovers(cursor, table_name):
+    """Drop the invalid _ccnew indexes an interrupted REINDEX CONCURRENTLY leaves behind"""
+    
+    try:
+        cursor.execute(REINDEX_LEFTOVERS_SQL, [table_name])
+        
+        for schema_name, index_name in cursor.fetchall():
+            cursor.execute(
+                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(
+                    sql.Identifier(schema_name, index_name)
+                )
+            )
+            logging.info(f"Dropped leftover index {index_name} on {table_name}")
+    except Exception as e:
+        logging.error(f"Error dropping leftover indexes on {table_name}: {str(e)}")
 
-check_legal_holds_task = PythonOperator(
-    task_id='check_legal_holds',
-    python_callable=check_legal_holds,
+def vacuum_touched_tables(**context):
+    """Vacuum and reindex only the tables the deletion actually modified"""
+    
+    state = pull_state(context, 'finalize_retention')
+    
+    touched = [table_name for table_name, deleted in state.deleted.items() if deleted > 0]
+    
+    if not touched:
+        logging.info("No tables modified by retention, skipping maintenance")
+        return []
+    
+    postgres_hook = PostgresHook(postgres_conn_id='compliance_db')
+    
+    # VACUUM and REINDEX CONCURRENTLY cannot run inside a transaction block
+    conn = postgres_hook.get_conn()
+    conn.autocommit = True
+    
+    failed = []
+    
+    try:
+        with conn.cursor() as cursor:
+            for table_name in touched:
+                table = sql.Identifier(table_name)
+                
+                try:
+                    cursor.execute(sql.SQL("VACUUM (ANALYZE) {}").format(table))
+                    cursor.execute(sql.SQL("REINDEX TABLE CONCURRENTLY {}").format(table))
+                    
+                    logging.info(f"Vacuumed and reindexed {table_name}")
+                except Exception as e:
+                    logging.error(f"Error maintaining {table_name}: {str(e)}")
+                    failed.append(table_name)
+                    drop_reindex_leftovers(cursor, table_name)
+    finally:
+        conn.close()
+    
+    # Every table gets its turn; the task still fails if any of them did
+    if failed:
+        raise Exception(f"Maintenance failed for tables: {', '.join(failed)}")
+    
+    return touched
+
+# Task definitions
+ensure_indexes_task = PythonOperator(
+    task_id='ensure_retention_indexes',
+    python_callable=ensure_retention_indexes,
+    pool='compliance_db_pool',
+    pool_slots=1,
     dag=dag
 )
 
-anonymize_data_task = PythonOperator(
-    task_id='anonymize_before_deletion',
-    python_callable=anonymize_before_deletion,
+# Holds one pool slot per concurrent probe connection
+identify_expired_task = PythonOperator(
+    task_id='identify_expired_data',
+    python_callable=identify_expired_data,
+    do_xcom_push=False,
+    pool='compliance_db_pool',
+    pool_slots=IDENTIFY_MAX_WORKERS,
     dag=dag
 )
 
-create_manifest_task = PythonOperator(
-    task_id='create_deletion_manifest',
-    python_callable=create_deletion_manifest,
+# Only its direct downstream is skipped, so cleanup still runs by trigger rule
+has_expired_task = ShortCircuitOperator(
+    task_id='has_expired_data',
+    python_callable=has_expired_data,
+    ignore_downstream_trigger_rules=False,
     dag=dag
 )
 
-execute_deletion_task = PythonOperator(
-    task_id='execute_data_deletion',
-    python_callable=execute_data_deletion,
+check_legal_holds_task = PythonOperator(
+    task_id='check_legal_holds',
+    python_callable=check_legal_holds,
+    do_xcom_push=False,
     dag=dag
 )
 
-generate_report_task = PythonOperator(
-    task_id='generate_compliance_report',
-    python_callable=generate_compliance_report,
+finalize_retention_task = PythonOperator(
+    task_id='finalize_retention',
+    python_callable=finalize_retention,
+    do_xcom_push=False,
+    pool='compliance_db_pool',
+    pool_slots=1,
+    depends_on_past=True,
     dag=dag
 )
 
-send_notification_task = PythonOperator(
+# Deferrable, so the worker slot is released while the POST is in flight
+send_notification_task = SimpleHttpOperator(
     task_id='send_compliance_notification',
-    python_callable=send_compliance_notification,
+    http_conn_id='notify',
+    endpoint='/compliance',
+    method='POST',
+    data="{{ ti.xcom_pull(task_ids='finalize_retention', key='notification') | tojson }}",
+    headers={'Content-Type': 'application/json'},
+    deferrable=True,
     dag=dag
 )
 
@@ -452,26 +1118,36 @@ send_notification_task = PythonOperator(
 cleanup_temp_files = BashOperator(
     task_id='cleanup_temp_files',
     bash_command="""
-    find /tmp -name "*.tmp" -mtime +7 -delete
-    find /var/log/app -name "*.log" -mtime +30 -delete
-    docker system prune -f --volumes --filter "until=24h"
+    set -e
+    # Directories may not exist yet; a missing one is nothing to clean up
+    if [ -d /tmp/compliance ]; then
+        find /tmp/compliance -name "*.tmp" -mtime +7 -delete
+    fi &
+    tmp_pid=$!
+    if [ -d /var/log/app/compliance ]; then
+        find /var/log/app/compliance -name "*.log" -mtime +30 -delete
+    fi &
+    log_pid=$!
+    wait "$tmp_pid"
+    wait "$log_pid"
+    docker container prune -f --filter "label=owner=compliance" --filter "until=24h"
+    docker volume prune -f --filter "label=owner=compliance"
     """,
+    trigger_rule='none_failed',
     dag=dag
 )
 
 # Database maintenance
-vacuum_databases = PostgresOperator(
+vacuum_databases = PythonOperator(
     task_id='vacuum_databases',
-    postgres_conn_id='compliance_db',
-    sql="""
-    VACUUM ANALYZE;
-    REINDEX DATABASE compliance_db;
-    """,
+    python_callable=vacuum_touched_tables,
+    pool='compliance_db_pool',
+    pool_slots=1,
     dag=dag
 )
 
 # Task dependencies
-identify_expired_task >> check_legal_holds_task >> anonymize_data_task
-anonymize_data_task >> create_manifest_task >> execute_deletion_task
-execute_deletion_task >> generate_report_task >> send_notification_task
-execute_deletion_task >> cleanup_temp_files >> vacuum_databases
+ensure_indexes_task >> identify_expired_task
+identify_expired_task >> has_expired_task >> check_legal_holds_task
+check_legal_holds_task >> finalize_retention_task >> send_notification_task
+finalize_retention_task >> cleanup_temp_files >> vacuum_databases
@@ -192,6 +192,17 @@ allow_data_deletion {
 legitimate_interest_override {
     input.processing_purpose == "legal_compliance"
 }
+EOF
+
+    # Airflow pools for the data retention DAG
+    cat > compliance/config/airflow/pools.json << 'EOF'
+{
+    "compliance_db_pool": {
+        "slots": 2,
+        "description": "Heavy retention tasks against compliance_db",
+        "include_deferred": false
+    }
+}
 EOF
 
     print_status "Configuration files created ✅"
@@ -344,6 +355,19 @@ CREATE TABLE compliance.legal_holds (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Per-table audit rows for each data retention deletion manifest, written
+-- by the data_retention_lifecycle DAG with COPY
+CREATE TABLE data_deletion_audit (
+    id BIGSERIAL PRIMARY KEY,
+    manifest_id BIGINT NOT NULL,
+    table_name VARCHAR(100) NOT NULL,
+    records BIGINT NOT NULL,
+    retention_days INTEGER NOT NULL,
+    oldest TIMESTAMP WITH TIME ZONE,
+    newest TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Create indexes
 CREATE INDEX idx_consent_records_data_subject ON gdpr.consent_records(data_subject_id);
 CREATE INDEX idx_consent_records_purpose ON gdpr.consent_records(purpose);
@@ -355,6 +379,7 @@ CREATE INDEX idx_audit_events_user ON audit.events(user_id);
 CREATE INDEX idx_audit_events_created_at ON audit.events(created_at);
 CREATE INDEX idx_legal_holds_table ON compliance.legal_holds(table_name);
 CREATE INDEX idx_legal_holds_status ON compliance.legal_holds(status);
+CREATE INDEX idx_data_deletion_audit_manifest ON data_deletion_audit(manifest_id);
 EOF
 
     print_status "Database schema created ✅"
@@ -442,6 +467,9 @@ Comprehensive compliance solution with GDPR, SOC 2 Type II, audit logging, data
 ## 🚀 Quick Start
 
 ```bash
+# Point retention notifications at your endpoint (required)
+export AIRFLOW_CONN_NOTIFY=http://<notification-host>:<port>
+
 # Start compliance infrastructure
 docker-compose -f compliance/docker-compose.compliance.yml up -d
 
@@ -500,6 +528,18 @@ EOF
     print_status "Documentation created ✅"
 }
 
+# Import Airflow pools into a running deployment
+setup_airflow_pools() {
+    print_header "Importing Airflow pools..."
+    
+    if docker ps --format '{{.Names}}' | grep -qx airflow-webserver; then
+        docker exec airflow-webserver airflow pools import /opt/airflow/config/pools.json
+        print_status "Airflow pools imported ✅"
+    else
+        print_warning "airflow-webserver is not running; pools are imported when it starts"
+    fi
+}
+
 # Main setup function
 main() {
     print_header "Starting Compliance System Setup"
@@ -510,13 +550,15 @@ main() {
     setup_database_schema
     setup_monitoring
     create_documentation
+    setup_airflow_pools
     
     print_status "Compliance system setup completed successfully! 🎉"
     echo ""
     echo "Next steps:"
-    echo "1. Start services: docker-compose -f compliance/docker-compose.compliance.yml up -d"
-    echo "2. Initialize database: Run the SQL initialization script"
-    echo "3. Configure Airflow DAGs for data retention"
+    echo "1. Set AIRFLOW_CONN_NOTIFY to the endpoint that receives retention notifications (required)"
+    echo "2. Start services: docker-compose -f compliance/docker-compose.compliance.yml up -d"
+    echo "3. Initialize database: Run the SQL initialization script"
+    echo "4. Configure Airflow DAGs for data retention"
     echo ""
     echo "Access points:"
     echo "- Kibana (Audit Logs): http://localhost:5601"